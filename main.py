@@ -1,54 +1,124 @@
 from __future__ import annotations
 
+import functools
+import logging
 import os
 import sys
+import threading
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
 
-import pytz
+import orjson
 import requests
 from requests import Response
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+log = logging.getLogger(__name__)
 
 # Load environment variables from .env file for local development
-# This is a no-op in GitHub Actions where env vars are set directly
-try:
-    from dotenv import load_dotenv
-    # Look for .env file in the same directory as this script
-    env_path = Path(__file__).parent / ".env"
-    if env_path.exists():
+# The dotenv import is skipped entirely when there is no .env file to load,
+# which is always the case in GitHub Actions where env vars are set directly
+env_path = Path(__file__).parent / ".env"
+if env_path.exists():
+    try:
+        from dotenv import load_dotenv
         load_dotenv(env_path)
-        print("📁 Loaded environment variables from .env file")
-except ImportError:
-    # python-dotenv not installed, rely on system environment variables
-    pass
-
-# Environment variables for sensitive configuration
-# These should be set via GitHub Secrets or local .env file
-GREENAPI_URL = os.environ.get("GREENAPI_URL", "")
-GREENAPI_INSTANCE_ID = os.environ.get("GREENAPI_INSTANCE_ID", "")
-GREENAPI_API_TOKEN = os.environ.get("GREENAPI_API_TOKEN", "")
-CHAT_ID = os.environ.get("WHATSAPP_CHAT_ID", "")
-SANITY_SCHEDULE_URL = os.environ.get("SANITY_SCHEDULE_URL", "")
-
-# Construct API URL from components
-API_URL_POLL = (
-    f"{GREENAPI_URL}/waInstance{GREENAPI_INSTANCE_ID}/sendPoll/{GREENAPI_API_TOKEN}"
-)
-
-API_URL_MESSAGE = (
-    f"{GREENAPI_URL}/waInstance{GREENAPI_INSTANCE_ID}/sendMessage/{GREENAPI_API_TOKEN}" 
+        log.info("📁 Loaded environment variables from .env file")
+    except ImportError:
+        # python-dotenv not installed, rely on system environment variables
+        pass
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Sensitive configuration read once from the environment.
+
+    Values should be set via GitHub Secrets or local .env file.
+    """
+
+    greenapi_url: str
+    instance_id: str
+    token: str
+    chat_id: str
+    sanity_url: str
+    poll_url: str
+    message_url: str
+
+    @classmethod
+    def from_env(cls) -> Config:
+        # Trailing slash would produce "//" in the path, which some proxies redirect
+        greenapi_url = os.environ.get("GREENAPI_URL", "").rstrip("/")
+        instance_id = os.environ.get("GREENAPI_INSTANCE_ID", "")
+        token = os.environ.get("GREENAPI_API_TOKEN", "")
+        # Construct API URLs from components
+        base = "/".join((greenapi_url, f"waInstance{instance_id}"))
+        return cls(
+            greenapi_url=greenapi_url,
+            instance_id=instance_id,
+            token=token,
+            chat_id=os.environ.get("WHATSAPP_CHAT_ID", ""),
+            sanity_url=os.environ.get("SANITY_SCHEDULE_URL", ""),
+            poll_url="/".join((base, "sendPoll", token)),
+            message_url="/".join((base, "sendMessage", token)),
+        )
+
+
+CONFIG = Config.from_env()
+
+_REQUIRED = (
+    ("GREENAPI_INSTANCE_ID", CONFIG.instance_id),
+    ("GREENAPI_API_TOKEN", CONFIG.token),
+    ("WHATSAPP_CHAT_ID", CONFIG.chat_id),
+    ("SANITY_SCHEDULE_URL", CONFIG.sanity_url),
 )
 
 POSITIVE_ANSWER = "Kyllä"
 NEGATIVE_ANSWER = "Ei"
-CANCEL_TEXT = "Huomio, tänään treeni on peruttu!"
-EXCEPTION_TEXT = "Huomio, poikkeuksellinen treeni!"
-STANDARD_TEXT= "Tänään vääntämään klo"
+CANCEL_TEXT = sys.intern("Huomio, tänään treeni on peruttu!")
+EXCEPTION_TEXT = sys.intern("Huomio, poikkeuksellinen treeni!")
+STANDARD_TEXT = sys.intern("Tänään vääntämään klo")
 MESSAGE_ERROR = "❌ Invalid schedule data structure"
-REQUEST_TIMEOUT = 10  # seconds
+REQUEST_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+FINNISH_TZ = ZoneInfo("Europe/Helsinki")
+SANITY_CACHE_PATH = Path(__file__).parent / ".sanity_cache.json"
 USE_SAMPLE_RESPONSE = False  # Set to True to use sample response data for testing
 
+# Payload templates, only the message is filled in per call
+_CANCEL_TEMPLATE = {"chatId": CONFIG.chat_id}
+_POLL_TEMPLATE = {
+    "chatId": CONFIG.chat_id,
+    "multipleAnswers": False,
+    "options": [
+        {"optionName": POSITIVE_ANSWER},
+        {"optionName": NEGATIVE_ANSWER},
+    ],
+}
+
+# Shared HTTP session so Sanity and GreenAPI calls reuse keep-alive connections
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            # HEAD is only used for the GreenAPI warm-up, which must cost one call
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS - {"HEAD"},
+        ),
+    ),
+)
+SESSION.headers.update({"Content-Type": "application/json"})
+# POST defaults bound once, Content-Type already comes from the session headers
+_post = functools.partial(SESSION.post, timeout=REQUEST_TIMEOUT)
+
 # Sample response data
 SAMPLE_RESPONSE = {
     "query": "*[_type == \"allDays\"]",
@@ -80,28 +150,104 @@ SAMPLE_RESPONSE = {
 }
 
 
-def get_current_date() -> str:
+def get_current_date(now: Optional[datetime] = None) -> str:
     """Get current date in Finnish time zone (YYYY-MM-DD)."""
-    finnish_tz = pytz.timezone("Europe/Helsinki")
-    return datetime.now(finnish_tz).strftime("%Y-%m-%d")
+    if now is None:
+        now = datetime.now(FINNISH_TZ)
+    return now.strftime("%Y-%m-%d")
 
 
-def get_current_day_of_week() -> str:
+def get_current_day_of_week(now: Optional[datetime] = None) -> str:
     """Get day of week in Finnish time zone."""
-    finnish_tz = pytz.timezone("Europe/Helsinki")
-    return datetime.now(finnish_tz).strftime("%A").lower()
+    if now is None:
+        now = datetime.now(FINNISH_TZ)
+    return now.strftime("%A").lower()
+
+
+def load_sanity_cache() -> Optional[Dict[str, Any]]:
+    """Load the cached Sanity response, or None if missing, unreadable or for another URL."""
+    try:
+        cache = orjson.loads(SANITY_CACHE_PATH.read_bytes())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cache, dict) or cache.get("url") != CONFIG.sanity_url:
+        return None
+    return cache
+
+
+def save_sanity_cache(response: Response) -> None:
+    """Persist the Sanity response together with its validators."""
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not etag and not last_modified:
+        return
+
+    # Sanity always serves UTF-8, decoding directly skips charset detection
+    body = response.content.decode("utf-8")
+    cache = {
+        "url": CONFIG.sanity_url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "body": body,
+    }
+    try:
+        SANITY_CACHE_PATH.write_bytes(orjson.dumps(cache))
+    except OSError as exc:
+        log.warning("⚠️ Failed to write Sanity cache: %s", exc)
 
 
 def get_schedule_data() -> Optional[Dict[str, Any]]:
-    """Fetch training schedule data from Sanity."""
+    """Fetch training schedule data from Sanity, revalidating the local cache."""
+    cache = load_sanity_cache()
+    headers = {}
+    if cache is not None:
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+        if cache.get("last_modified"):
+            headers["If-Modified-Since"] = cache["last_modified"]
+
     try:
-        response = requests.get(SANITY_SCHEDULE_URL, timeout=REQUEST_TIMEOUT)
+        response = SESSION.get(CONFIG.sanity_url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304 and cache is not None:
+            try:
+                data = orjson.loads(cache["body"])
+            except (KeyError, TypeError, orjson.JSONDecodeError):
+                # Broken cache, drop the validators and fetch the full document
+                response = SESSION.get(CONFIG.sanity_url, timeout=REQUEST_TIMEOUT)
+            else:
+                log.info("📦 Schedule not modified, using cached Sanity response")
+                return data
         response.raise_for_status()
-        return response.json()
-    except requests.RequestException as exc:
-        print(f"❌ Failed to fetch schedule from Sanity: {exc}")
+        data = orjson.loads(response.content)
+    except (requests.RequestException, orjson.JSONDecodeError) as exc:
+        log.error("❌ Failed to fetch schedule from Sanity: %s", exc)
         return None
 
+    save_sanity_cache(response)
+    return data
+
+
+def warm_up_greenapi() -> None:
+    """Open a keep-alive connection to GreenAPI so the later send reuses it."""
+    try:
+        # Unauthenticated HEAD on the host, so it does not use the API quota
+        SESSION.head(CONFIG.greenapi_url, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException:
+        # Warm-up is best effort, the real request reports its own errors
+        pass
+
+
+@functools.lru_cache(maxsize=16)
+def poll_message(start_time: str) -> str:
+    """Build the regular training poll question."""
+    return f"{STANDARD_TEXT} {start_time}?"
+
+
+@functools.lru_cache(maxsize=16)
+def exception_message(start_time: str) -> str:
+    """Build the exceptional training poll question."""
+    return f"{EXCEPTION_TEXT} {STANDARD_TEXT} {start_time}?"
+
 
 def get_message_for_current_day(
         data: Dict[str, Any],
@@ -114,90 +260,69 @@ def get_message_for_current_day(
         return MESSAGE_ERROR
     
     all_days = data['result'][0]
-    training_days = all_days['trainingDays']
-    canceled_days = all_days['canceledDays']
-    exception_days = all_days['exceptionDays']
+    canceled_set = {d['date'] for d in all_days['canceledDays']}
+    # Reversed so the first entry wins when a date or weekday is duplicated
+    exception_by_date = {d['date']: d for d in reversed(all_days['exceptionDays'])}
+    training_by_weekday = {
+        td['weekDay']['key']: td for td in reversed(all_days['trainingDays'])
+    }
 
-    if current_date in [d['date'] for d in canceled_days]:
-        return API_URL_MESSAGE, CANCEL_TEXT
+    if current_date in canceled_set:
+        return CONFIG.message_url, CANCEL_TEXT
 
-    if current_date in [d['date'] for d in exception_days]:
-        exception = next(d for d in exception_days if d['date'] == current_date)
-        start_time = exception['startTime']
-        poll_message = f"{EXCEPTION_TEXT} {STANDARD_TEXT} {start_time}?"
-        return API_URL_POLL, poll_message
+    if (exception := exception_by_date.get(current_date)):
+        return CONFIG.poll_url, exception_message(exception['startTime'])
 
-    if any(td['weekDay']['key'] == day_of_week for td in training_days):
-        training_day = next(td for td in training_days if td['weekDay']['key'] == day_of_week)
-        start_time = training_day['startTime']
-        poll_message = f"{STANDARD_TEXT} {start_time}?"
-        return API_URL_POLL, poll_message
+    if (training_day := training_by_weekday.get(day_of_week)):
+        return CONFIG.poll_url, poll_message(training_day['startTime'])
 
     return None
 
 
-def build_payload(message: str) -> Dict[str, Any]:
-    if message == None:
+def build_payload(message: Optional[str]) -> Optional[Dict[str, Any]]:
+    if message is None:
         return None
-    
+
     if message == CANCEL_TEXT:
-        return {
-            "chatId": CHAT_ID,
-            "message": message,
-        }
-    
-    return {
-        "chatId": CHAT_ID,
-        "message": message,
-        "multipleAnswers": False,
-        "options": [
-            {"optionName": POSITIVE_ANSWER},
-            {"optionName": NEGATIVE_ANSWER},
-        ],
-    }
+        return {**_CANCEL_TEMPLATE, "message": message}
+
+    return {**_POLL_TEMPLATE, "message": message}
 
 
 def send_message(url: str, payload: Dict[str, Any]) -> Response:
-    response = requests.post(
-        url,
-        json=payload,
-        headers={"Content-Type": "application/json"},
-        timeout=REQUEST_TIMEOUT,
-    )
+    response = _post(url, data=orjson.dumps(payload))
     response.raise_for_status()
     return response
 
 
 def validate_environment() -> bool:
     """Validate that all required environment variables are set."""
-    required_vars = {
-        "GREENAPI_INSTANCE_ID": GREENAPI_INSTANCE_ID,
-        "GREENAPI_API_TOKEN": GREENAPI_API_TOKEN,
-        "WHATSAPP_CHAT_ID": CHAT_ID,
-        "SANITY_SCHEDULE_URL": SANITY_SCHEDULE_URL,
-    }
-
-    missing = [name for name, value in required_vars.items() if not value]
+    missing = tuple(name for name, value in _REQUIRED if not value)
 
     if missing:
-        print(f"❌ Missing required environment variables: {', '.join(missing)}")
-        print("Please set these variables in GitHub Secrets or your environment or yml.")
+        log.error("❌ Missing required environment variables: %s", ", ".join(missing))
+        log.error("Please set these variables in GitHub Secrets or your environment or yml.")
         return False
 
     return True
 
 
 def main() -> None:
-    print(f"🕐 Current Finnish time: {datetime.now(pytz.timezone('Europe/Helsinki'))}")
+    now = datetime.now(FINNISH_TZ)
+    log.info("🕐 Current Finnish time: %s", now)
 
     if not validate_environment():
         sys.exit(1)
 
-    current_date = get_current_date()
-    current_day = get_current_day_of_week()
+    current_date = get_current_date(now)
+    current_day = get_current_day_of_week(now)
+
+    log.info("📅 Current date: %s", current_date)
+    log.info("📅 Current day of week: %s", current_day)
 
-    print(f"📅 Current date: {current_date}")
-    print(f"📅 Current day of week: {current_day}")
+    # Warm up the GreenAPI connection while the schedule is being fetched.
+    # Daemon thread, so exits that never reach GreenAPI don't wait for it
+    threading.Thread(target=warm_up_greenapi, daemon=True).start()
 
     if USE_SAMPLE_RESPONSE:
         schedule_data = SAMPLE_RESPONSE
@@ -209,28 +334,29 @@ def main() -> None:
 
     result = get_message_for_current_day(schedule_data, current_date, current_day)
     if result is None:
-        print("ℹ️ No training scheduled for today. Exiting.")
+        log.info("ℹ️ No training scheduled for today. Exiting.")
         sys.exit(0)
     url, message = result
 
     if message == MESSAGE_ERROR:
-        print(f"{MESSAGE_ERROR}")
+        log.error(MESSAGE_ERROR)
         sys.exit(1)
 
-    print(f"📨 Preparing to send message: {message}")
+    log.info("📨 Preparing to send message: %s", message)
 
     try:
         payload = build_payload(message)
         response = send_message(url, payload)
-        print("✅ Message sent successfully")
-        print(f"📄 Response: {response.text}")
+        log.info("✅ Message sent successfully")
+        log.info("📄 Response: %s", response.text)
     except requests.RequestException as exc:
-        resp = getattr(exc, "response", None)
+        resp = exc.response
         if resp is not None:
-            print(f"❌ Failed to send poll: {resp.status_code} {resp.reason}")
-            print(f"📄 Error body: {resp.text}")
+            log.exception("❌ Failed to send poll: %s %s", resp.status_code, resp.reason)
+            # Only a short prefix is logged, and decoded without charset detection
+            log.error("📄 Error body: %s", resp.content[:512].decode("utf-8", "replace"))
         else:
-            print(f"❌ Failed to send poll: {exc}")
+            log.exception("❌ Failed to send poll: %s", exc)
         sys.exit(1)
 
 